@@ -0,0 +1,123 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BatchPredictor:
+    """Groups concurrent single-image predictions into one model call.
+
+    Images are queued by the request threads. A background worker takes
+    the first queued image, keeps collecting until it has ``max_batch_size``
+    images or ``max_wait_ms`` have passed, then calls ``predict_fn`` once on
+    the stacked batch and hands every caller its own result.
+
+    Submitted arrays are copied into a preallocated batch buffer by the
+    worker, so callers must not modify them until their future resolves.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=10):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._batch_buf = None
+        self._batch_sizes = Counter()
+        self._batches = 0
+        self._items = 0
+
+    def submit(self, img_array):
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((img_array, future))
+        return future
+
+    def predict(self, img_array, timeout=None):
+        return self.submit(img_array).result(timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            batches = self._batches
+            items = self._items
+            sizes = dict(sorted(self._batch_sizes.items()))
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'batches': batches,
+            'images': items,
+            'mean_batch_size': round(items / batches, 2) if batches else 0.0,
+            'batch_sizes': sizes,
+            'queue_depth': self.queue_depth(),
+        }
+
+    def _ensure_worker(self):
+        # The worker is started lazily so that a process forked after import
+        # (e.g. a pre-loading WSGI server) gets its own thread.
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                self._queue = queue.Queue()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='batch-predictor', daemon=True)
+            self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [item for item in self._collect() if item[1].set_running_or_notify_cancel()]
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch):
+        first = batch[0][0]
+        buf = self._batch_buf
+        if buf is None or buf.shape[1:] != first.shape or buf.dtype != first.dtype:
+            buf = self._batch_buf = np.empty((self.max_batch_size,) + first.shape, first.dtype)
+        inputs = buf[:len(batch)]
+        for i, (img_array, _) in enumerate(batch):
+            inputs[i] = img_array
+        try:
+            results = self.predict_fn(inputs)
+        except Exception as exc:
+            logger.exception("Batch prediction failed for %d images", len(batch))
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+        with self._lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._batch_sizes[len(batch)] += 1
+        logger.debug("Predicted batch of %d images", len(batch))
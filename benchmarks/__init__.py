@@ -0,0 +1,13 @@
+"""Reproducible inference benchmarks and HTTP load tests.
+
+    python -m benchmarks run -o before.json
+    python -m benchmarks run -o after.json --url http://127.0.0.1:8000
+    python -m benchmarks compare before.json after.json --threshold 10
+
+``run`` measures cold start (import + model load), image decode and
+single-image latency percentiles, batched throughput and, with ``--url``,
+end-to-end HTTP throughput at rising concurrency. Every HTTP request sends a
+different image so the app's prediction cache never answers it; pass
+``--repeat-images`` to measure cache hits instead. ``compare`` exits non-zero
+when any metric got worse by more than the threshold percentage.
+"""
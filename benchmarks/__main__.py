@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks import compare as compare_mod
+from benchmarks import http_bench, model_bench
+from benchmarks.images import encode_jpeg, sample_images, synthetic_images
+
+SUITES = ['cold_start', 'decode', 'latency', 'throughput', 'http']
+
+
+def int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def run(args):
+    import inference
+    from cache import file_fingerprint
+
+    images = sample_images(args.images, args.count, args.seed) if args.images else []
+    if not images:
+        images = synthetic_images(args.count, args.seed)
+    jpegs = [encode_jpeg(img) for img in images]
+    suites = [suite for suite in SUITES if suite not in args.skip]
+    if not args.url and 'http' in suites:
+        suites.remove('http')
+
+    results = {}
+    for suite in suites:
+        print(f"Running {suite}...", file=sys.stderr)
+        if suite == 'cold_start':
+            results[suite] = model_bench.cold_start(args.cold_runs)
+        elif suite == 'decode':
+            results[suite] = model_bench.decode_latency(jpegs, args.repeats)
+        elif suite == 'latency':
+            results[suite] = model_bench.single_latency(images, args.repeats)
+        elif suite == 'throughput':
+            results[suite] = model_bench.batch_throughput(images, args.batch_sizes)
+        elif suite == 'http':
+            url = args.url.rstrip('/') + args.endpoint
+            results[suite] = http_bench.load_test(url, images, args.concurrency, args.requests,
+                                                  unique=not args.repeat_images)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'backend': inference.BACKEND,
+            'model_path': inference.MODEL_PATH,
+            'model_version': file_fingerprint(inference.MODEL_PATH) if os.path.exists(inference.MODEL_PATH) else None,
+            'images': 'synthetic' if not args.images else args.images,
+            'seed': args.seed,
+            'http_unique_images': not args.repeat_images,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+    return 0
+
+
+def compare(args):
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare_mod.compare(base, new, args.threshold)
+    width = max((len(row['metric']) for row in rows), default=6)
+    print(f"{'metric':<{width}}  {'base':>12}  {'new':>12}  {'worse by':>9}")
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        print(f"{row['metric']:<{width}}  {row['base']:>12.3f}  {row['new']:>12.3f}  {row['change']:>8.1f}%{flag}")
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"{len(regressions)} metrics regressed by more than {args.threshold}%", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Inference benchmarks.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help="run the benchmarks and write a JSON report")
+    run_parser.add_argument('-o', '--output', default='bench_results.json')
+    run_parser.add_argument('--images', help="sample folder (train_Data layout); default: synthetic images")
+    run_parser.add_argument('--count', type=int, default=64, help="distinct images to use")
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--repeats', type=int, default=100, help="samples for latency percentiles")
+    run_parser.add_argument('--cold-runs', type=int, default=3)
+    run_parser.add_argument('--batch-sizes', type=int_list, default=[1, 4, 16, 32, 64])
+    run_parser.add_argument('--url', help="base URL of a running app for the HTTP benchmark")
+    run_parser.add_argument('--endpoint', default='/', help="upload endpoint for the HTTP benchmark")
+    run_parser.add_argument('--concurrency', type=int_list, default=[1, 2, 4, 8, 16])
+    run_parser.add_argument('--requests', type=int, default=200, help="requests per concurrency level")
+    run_parser.add_argument('--repeat-images', action='store_true',
+                            help="cycle the same images over HTTP instead of making every request unique "
+                                 "(measures prediction cache hits)")
+    run_parser.add_argument('--skip', type=lambda v: v.split(','), default=[],
+                            help=f"comma-separated suites to skip: {','.join(SUITES)}")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = sub.add_parser('compare', help="compare two reports and fail on regressions")
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=10.0, help="allowed slowdown in percent")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
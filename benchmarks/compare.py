@@ -0,0 +1,41 @@
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def higher_is_better(name):
+    return name.endswith('_per_s')
+
+
+def lower_is_better(name):
+    return name.endswith(('_ms', '_s', '.errors'))
+
+
+def compare(base, new, threshold):
+    """Return one row per metric present in both runs, worst change first.
+
+    ``change`` is the percentage by which the metric got worse (negative
+    means it improved); rows beyond ``threshold`` are marked as regressions.
+    """
+    base_flat = flatten(base['results'])
+    new_flat = flatten(new['results'])
+    rows = []
+    for name in sorted(base_flat.keys() & new_flat.keys()):
+        if not (higher_is_better(name) or lower_is_better(name)):
+            continue
+        old, cur = base_flat[name], new_flat[name]
+        if old == 0:
+            change = 0.0 if cur == 0 else float('inf')
+        else:
+            change = 100 * (cur - old) / abs(old)
+        if higher_is_better(name):
+            change = -change
+        rows.append({'metric': name, 'base': old, 'new': cur, 'change': change,
+                     'regression': change > threshold})
+    return sorted(rows, key=lambda row: row['change'], reverse=True)
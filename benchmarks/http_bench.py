@@ -0,0 +1,75 @@
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks.images import encode_jpeg
+from benchmarks.stats import summarize
+
+
+def multipart_body(field, filename, data, content_type='image/jpeg'):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def post_image(url, jpeg, timeout):
+    body, content_type = multipart_body('file', 'leaf.jpg', jpeg)
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': content_type}, method='POST')
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            ok = resp.status < 400
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def unique_jpegs(images, start, count):
+    """JPEGs that all decode to different pixels, so none is a prediction cache hit.
+
+    Request ``i`` writes the bits of ``i`` as black/white pixels into the
+    top row of one of the base images.
+    """
+    jpegs = []
+    for i in range(start, start + count):
+        img = images[i % len(images)].copy()
+        bits = np.array([(i >> b) & 1 for b in range(32)], np.uint8) * 255
+        img[0, :32] = bits[:, np.newaxis]
+        jpegs.append(encode_jpeg(img))
+    return jpegs
+
+
+def load_test(url, images, concurrency_levels, requests_per_level, unique=True, timeout=60):
+    """POST images at each concurrency level.
+
+    With ``unique`` every request across all levels carries a different
+    image. Otherwise the base images are cycled and, against an app with
+    the prediction cache on, mostly measure cache hits.
+    """
+    results = {}
+    base_jpegs = [encode_jpeg(img) for img in images]
+    for level, concurrency in enumerate(concurrency_levels):
+        if unique:
+            jpegs = unique_jpegs(images, level * requests_per_level, requests_per_level)
+        else:
+            jpegs = base_jpegs
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            start = time.perf_counter()
+            outcomes = list(executor.map(lambda i: post_image(url, jpegs[i % len(jpegs)], timeout),
+                                         range(requests_per_level)))
+            elapsed = time.perf_counter() - start
+        latencies = [seconds for ok, seconds in outcomes if ok]
+        result = {
+            'requests_per_s': len(latencies) / elapsed,
+            'errors': sum(1 for ok, _ in outcomes if not ok),
+        }
+        if latencies:
+            result.update(summarize(latencies))
+        results[f'concurrency_{concurrency}'] = result
+    return results
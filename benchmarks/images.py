@@ -0,0 +1,39 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+import bulk
+from inference import IMAGE_SIZE, load_image
+
+
+def synthetic_images(count, seed=0, size=IMAGE_SIZE):
+    """Leaf-sized RGB images: a noisy green leaf with a few brown lesions."""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:size, :size]
+    images = []
+    for _ in range(count):
+        img = np.empty((size, size, 3), np.float32)
+        img[...] = rng.uniform(10, 40, 3)
+        leaf = ((xx - size / 2) / (size * 0.45)) ** 2 + ((yy - size / 2) / (size * 0.3)) ** 2 <= 1
+        img[leaf] = rng.uniform([40, 110, 30], [90, 180, 70])
+        for _ in range(rng.integers(0, 12)):
+            cx, cy, r = rng.uniform(0, size), rng.uniform(0, size), rng.uniform(2, size / 16)
+            spot = leaf & ((xx - cx) ** 2 + (yy - cy) ** 2 <= r * r)
+            img[spot] = rng.uniform([90, 60, 20], [140, 90, 50])
+        img += rng.normal(0, 8, img.shape)
+        images.append(np.clip(img, 0, 255).astype(np.uint8))
+    return images
+
+
+def sample_images(folder, count, seed=0):
+    paths = [path for _, _, path in bulk.iter_directory(folder)]
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(len(paths), size=min(count, len(paths)), replace=False) if paths else []
+    return [load_image(paths[i]) for i in sorted(chosen)]
+
+
+def encode_jpeg(img_array, quality=90):
+    buf = io.BytesIO()
+    Image.fromarray(img_array).save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
@@ -0,0 +1,76 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import inference
+from benchmarks.stats import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = """
+import json, time
+start = time.perf_counter()
+import inference
+imported = time.perf_counter()
+inference.get_backend()
+loaded = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'load_s': loaded - imported, 'total_s': loaded - start}))
+"""
+
+
+def cold_start(runs=3):
+    # Fresh interpreters, so nothing is already imported or loaded
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', COLD_START], cwd=ROOT, check=True,
+                             capture_output=True, text=True).stdout
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    return {key: float(np.median([s[key] for s in samples])) for key in samples[0]}
+
+
+def decode_latency(jpegs, repeats):
+    seconds = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        inference.load_image(io.BytesIO(jpegs[i % len(jpegs)]))
+        seconds.append(time.perf_counter() - start)
+    return summarize(seconds)
+
+
+def single_latency(images, repeats, warmup=5):
+    backend = inference.get_backend()
+    for i in range(warmup):
+        backend.predict(images[i % len(images)][np.newaxis])
+    seconds = []
+    for i in range(repeats):
+        batch = images[i % len(images)][np.newaxis]
+        start = time.perf_counter()
+        backend.predict(batch)
+        seconds.append(time.perf_counter() - start)
+    return summarize(seconds)
+
+
+def batch_throughput(images, batch_sizes, min_images=256, warmup=2):
+    backend = inference.get_backend()
+    results = {}
+    for batch_size in batch_sizes:
+        batch = np.stack([images[i % len(images)] for i in range(batch_size)])
+        for _ in range(warmup):
+            backend.predict(batch)
+        calls = max(1, -(-min_images // batch_size))
+        seconds = []
+        for _ in range(calls):
+            start = time.perf_counter()
+            backend.predict(batch)
+            seconds.append(time.perf_counter() - start)
+        total = sum(seconds)
+        results[f'batch_{batch_size}'] = {
+            'images_per_s': batch_size * calls / total,
+            'batch_p50_ms': summarize(seconds)['p50_ms'],
+        }
+    return results
@@ -0,0 +1,13 @@
+import numpy as np
+
+
+def summarize(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        'n': int(ms.size),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p90_ms': float(np.percentile(ms, 90)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+    }
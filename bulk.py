@@ -0,0 +1,195 @@
+"""Bulk prediction over directories, ZIP archives or uploaded files.
+
+Images are decoded and pushed through the model in fixed-size batches and
+each result is written out as soon as its batch finishes, so memory stays
+bounded by the batch size however many images there are.
+
+    python bulk.py train_Data -o results.jsonl
+    python bulk.py scouting.zip -o results.csv --batch-size 128
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from inference import class_names, load_image, predict_batch
+
+# Same extensions image_dataset_from_directory accepts
+IMAGE_EXTENSIONS = {'bmp', 'gif', 'jpeg', 'jpg', 'png'}
+# Largest uncompressed ZIP member that is read; bigger ones are reported as errors
+MAX_MEMBER_BYTES = 16 * 1024 * 1024
+CSV_FIELDS = ['file', 'label', 'pred_class', 'pred_conf', 'error']
+
+
+def is_image(name):
+    return '.' in name and name.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def folder_label(name):
+    # train_Data layout: <root>/<class name>/<image>
+    parts = name.replace('\\', '/').split('/')
+    if len(parts) > 1 and parts[-2] in class_names:
+        return parts[-2]
+    return None
+
+
+def iter_directory(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if is_image(filename):
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, root)
+                yield name, folder_label(name), path
+
+
+class MemberTooLarge(Exception):
+    pass
+
+
+def _read_member(zf, info, max_bytes):
+    # The header's size is only a claim, so never read more than the limit either way
+    if max_bytes is None:
+        return io.BytesIO(zf.read(info))
+    if info.file_size <= max_bytes:
+        with zf.open(info) as member:
+            data = member.read(max_bytes + 1)
+        if len(data) <= max_bytes:
+            return io.BytesIO(data)
+    return MemberTooLarge(f"{info.filename} is over the {max_bytes} byte limit uncompressed")
+
+
+def iter_zip(archive, max_member_bytes=MAX_MEMBER_BYTES):
+    """Yield ``(name, label, source)`` for each image in a ZIP archive.
+
+    ``archive`` is a path or a seekable binary file object. Members larger
+    than ``max_member_bytes`` uncompressed are not read; their source is a
+    ``MemberTooLarge`` error, which ``predict_stream`` reports.
+    """
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            if not info.is_dir() and is_image(info.filename):
+                # Read while the archive is still open; predict_stream only
+                # pulls one batch of members ahead, so memory stays bounded
+                yield info.filename, folder_label(info.filename), _read_member(zf, info, max_member_bytes)
+
+
+def _load(item):
+    name, _, source = item
+    try:
+        if isinstance(source, Exception):
+            raise source
+        return load_image(source), None
+    except MemberTooLarge as exc:
+        return None, f'{type(exc).__name__}: {exc}'
+    except Exception as exc:
+        # Decoder messages can include object reprs or server paths
+        return None, f'{type(exc).__name__}: cannot decode {name}'
+
+
+def predict_stream(items, batch_size=64, workers=4):
+    """Yield one result dict per ``(name, label, source)`` item, in order.
+
+    ``source`` is a path, a binary file object or an exception to report.
+    Images that cannot be decoded are reported with an ``error`` field.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            chunk = list(islice(items, batch_size))
+            if not chunk:
+                return
+            loaded = list(executor.map(_load, chunk))
+            arrays = [img_array for img_array, _ in loaded if img_array is not None]
+            preds = iter(predict_batch(np.stack(arrays)) if arrays else [])
+            for (name, label, _), (img_array, error) in zip(chunk, loaded):
+                result = {'file': name, 'label': label}
+                if error is None:
+                    result['pred_class'], result['pred_conf'] = next(preds)
+                else:
+                    result['error'] = error
+                yield result
+
+
+def format_jsonl(results):
+    for result in results:
+        yield json.dumps(result) + '\n'
+
+
+def format_csv(results):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    yield buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    for result in results:
+        writer.writerow(result)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+FORMATTERS = {'jsonl': format_jsonl, 'csv': format_csv}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict tomato leaf diseases for a directory or ZIP of images.")
+    parser.add_argument('source', help="image directory (e.g. train_Data) or .zip archive")
+    parser.add_argument('-o', '--output', help="output file (default: stdout)")
+    parser.add_argument('-f', '--format', choices=sorted(FORMATTERS),
+                        help="output format (default: from the output extension, else jsonl)")
+    parser.add_argument('-b', '--batch-size', type=int, default=64)
+    parser.add_argument('-w', '--workers', type=int, default=4, help="image decoding threads")
+    parser.add_argument('--max-member-bytes', type=int, default=MAX_MEMBER_BYTES,
+                        help="skip ZIP members larger than this when uncompressed")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        fmt = 'csv' if args.output and args.output.lower().endswith('.csv') else 'jsonl'
+    if os.path.isdir(args.source):
+        items = iter_directory(args.source)
+    elif zipfile.is_zipfile(args.source):
+        items = iter_zip(args.source, max_member_bytes=args.max_member_bytes)
+    else:
+        parser.error(f"{args.source} is neither a directory nor a ZIP archive")
+
+    counts = {'images': 0, 'errors': 0, 'labelled': 0, 'correct': 0}
+
+    def tally(results):
+        for result in results:
+            counts['images'] += 1
+            if 'error' in result:
+                counts['errors'] += 1
+            elif result['label'] is not None:
+                counts['labelled'] += 1
+                counts['correct'] += result['label'] == result['pred_class']
+            yield result
+
+    out = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        results = predict_stream(items, batch_size=args.batch_size, workers=args.workers)
+        for line in FORMATTERS[fmt](tally(results)):
+            out.write(line)
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    summary = f"Predicted {counts['images']} images ({counts['errors']} unreadable)"
+    if counts['labelled']:
+        summary += f", accuracy {100 * counts['correct'] / counts['labelled']:.2f}% on {counts['labelled']} labelled"
+    print(summary, file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def image_key(img_array):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f'{img_array.dtype}{img_array.shape}'.encode())
+    h.update(img_array.tobytes())
+    return h.hexdigest()
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PredictionCache:
+    """Bounded LRU cache of predictions keyed by decoded image content.
+
+    Entries are tagged with ``model_version`` (the fingerprint of the loaded
+    model file); a persisted cache written by a different model is discarded
+    on load. ``ttl`` is in seconds and ``None`` keeps entries until evicted.
+    When ``path`` is set the cache is written there every ``save_every`` new
+    entries and at interpreter exit.
+    """
+
+    def __init__(self, max_entries=4096, ttl=None, path=None, model_version=None, save_every=64):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.model_version = model_version
+        self.save_every = save_every
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Held for the whole write so concurrent saves never share the temp file
+        self._save_lock = threading.Lock()
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and now - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._unsaved += 1
+            save = self.path and self._unsaved >= self.save_every
+            if save:
+                # Only the thread that crosses the threshold writes the file
+                self._unsaved = 0
+        if save:
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._unsaved = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'model_version': self.model_version,
+                'path': self.path,
+            }
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.warning("Ignoring unreadable prediction cache %s", self.path)
+            return
+        if data.get('model_version') != self.model_version:
+            logger.info("Model changed, discarding prediction cache %s", self.path)
+            return
+        now = time.time()
+        with self._lock:
+            for key, value, stored_at in data.get('entries', []):
+                if self.ttl is None or now - stored_at <= self.ttl:
+                    self._entries[key] = (tuple(value), stored_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                entries = [[key, list(value), stored_at] for key, (value, stored_at) in self._entries.items()]
+                self._unsaved = 0
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump({'model_version': self.model_version, 'entries': entries}, f)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                logger.exception("Could not write prediction cache %s", self.path)
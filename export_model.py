@@ -0,0 +1,158 @@
+"""Export Model.h5 to a lighter runtime format and check it against Keras.
+
+    python export_model.py tflite -o Model.tflite
+    python export_model.py tflite --quantize int8 --calibration-dir train_Data -o Model.tflite
+    python export_model.py onnx --check train_Data -o Model.onnx
+
+Serve the result with INFERENCE_BACKEND=tflite (or onnx). ``--check`` runs
+both models on the notebook's test split and fails if their top-1
+predictions agree on less than ``--min-agreement`` of the images.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+import bulk
+from inference import IMAGE_SIZE, KERAS_MODEL_PATH, load_backend, load_image
+
+QUANTIZE_MODES = ['none', 'dynamic', 'float16', 'int8']
+
+
+def calibration_images(data_dir, samples, seed=123):
+    paths = [path for _, _, path in bulk.iter_directory(data_dir)]
+    for path in random.Random(seed).sample(paths, min(samples, len(paths))):
+        yield load_image(path)[np.newaxis].astype(np.float32)
+
+
+def _input_signature(tf):
+    return [tf.TensorSpec((None, IMAGE_SIZE, IMAGE_SIZE, 3), tf.float32, name='input')]
+
+
+def export_tflite(model, output, quantize='none', calibration_dir=None, samples=200):
+    import tensorflow as tf
+    serve = tf.function(lambda x: model(x, training=False), input_signature=_input_signature(tf))
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([serve.get_concrete_function()], model)
+    if quantize != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == 'int8':
+        # Ops without an int8 kernel fall back to float; model I/O stays float32
+        converter.representative_dataset = lambda: ([img] for img in calibration_images(calibration_dir, samples))
+    with open(output, 'wb') as f:
+        f.write(converter.convert())
+
+
+def export_onnx(model, output, quantize='none', calibration_dir=None, samples=200):
+    import tensorflow as tf
+    import tf2onnx
+    if quantize == 'float16':
+        raise ValueError("float16 export is only supported for tflite")
+    fd, tmp_path = tempfile.mkstemp(suffix='.onnx')
+    os.close(fd)
+    target = output if quantize == 'none' else tmp_path
+    try:
+        tf2onnx.convert.from_keras(model, input_signature=_input_signature(tf), opset=13, output_path=target)
+        if quantize == 'dynamic':
+            from onnxruntime.quantization import quantize_dynamic
+            quantize_dynamic(tmp_path, output)
+        elif quantize == 'int8':
+            from onnxruntime.quantization import CalibrationDataReader, quantize_static
+
+            class Reader(CalibrationDataReader):
+                def __init__(self):
+                    self.images = calibration_images(calibration_dir, samples)
+
+                def get_next(self):
+                    img = next(self.images, None)
+                    return None if img is None else {'input': img}
+
+            quantize_static(tmp_path, output, Reader())
+    finally:
+        os.remove(tmp_path)
+
+
+EXPORTERS = {'tflite': export_tflite, 'onnx': export_onnx}
+
+
+def load_test_split(data_dir, batch_size=32):
+    # Same split as Tomato_disease_detection.ipynb, with the shuffle pinned so
+    # the test images do not change between iterations
+    import tensorflow as tf
+    dataset = tf.keras.preprocessing.image_dataset_from_directory(
+        data_dir,
+        seed=123,
+        shuffle=True,
+        image_size=(IMAGE_SIZE, IMAGE_SIZE),
+        batch_size=batch_size
+    )
+    ds_size = len(dataset)
+    ds = dataset.shuffle(10000, seed=12, reshuffle_each_iteration=False)
+    train_size = int(ds_size * 0.8)
+    val_size = int(ds_size * 0.10)
+    return ds.skip(train_size).skip(val_size)
+
+
+def check_parity(reference, candidate, test_set):
+    images = correct_ref = correct_cand = agree = 0
+    max_diff = 0.0
+    for imgs, lbls in test_set:
+        imgs = imgs.numpy()
+        lbls = lbls.numpy()
+        ref = reference.predict(imgs)
+        cand = candidate.predict(imgs)
+        ref_lbls = np.argmax(ref, axis=1)
+        cand_lbls = np.argmax(cand, axis=1)
+        images += len(lbls)
+        correct_ref += int(np.sum(ref_lbls == lbls))
+        correct_cand += int(np.sum(cand_lbls == lbls))
+        agree += int(np.sum(ref_lbls == cand_lbls))
+        max_diff = max(max_diff, float(np.max(np.abs(ref - cand))))
+    return {
+        'images': images,
+        'reference_accuracy': correct_ref / images if images else 0.0,
+        'candidate_accuracy': correct_cand / images if images else 0.0,
+        'agreement': agree / images if images else 0.0,
+        'max_prob_diff': max_diff,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export Model.h5 for the tflite or onnx inference backend.")
+    parser.add_argument('format', choices=sorted(EXPORTERS))
+    parser.add_argument('-o', '--output', help="output file (default: Model.<format>)")
+    parser.add_argument('--model', default=KERAS_MODEL_PATH, help="Keras model to export")
+    parser.add_argument('-q', '--quantize', choices=QUANTIZE_MODES, default='none')
+    parser.add_argument('--calibration-dir', default='train_Data',
+                        help="train_Data-style folder sampled for int8 calibration")
+    parser.add_argument('--calibration-samples', type=int, default=200)
+    parser.add_argument('--check', metavar='DATA_DIR',
+                        help="compare against the Keras model on the notebook's test split of DATA_DIR")
+    parser.add_argument('--min-agreement', type=float, default=0.99)
+    args = parser.parse_args(argv)
+
+    output = args.output or f'Model.{args.format}'
+    if args.quantize == 'int8' and not os.path.isdir(args.calibration_dir):
+        parser.error(f"int8 quantization needs calibration images, {args.calibration_dir} not found")
+
+    reference = load_backend('keras', args.model)
+    EXPORTERS[args.format](reference.model, output, quantize=args.quantize,
+                           calibration_dir=args.calibration_dir, samples=args.calibration_samples)
+    print(f"Wrote {output} ({os.path.getsize(output) / 1e6:.2f} MB)", file=sys.stderr)
+
+    if args.check:
+        report = check_parity(reference, load_backend(args.format, output), load_test_split(args.check))
+        print(json.dumps(report, indent=2))
+        if report['agreement'] < args.min_agreement:
+            print(f"Agreement {report['agreement']:.4f} is below {args.min_agreement}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import itertools
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+KERAS_MODEL_PATH = 'Model.h5'
+IMAGE_SIZE = 256
+
+# INFERENCE_BACKEND selects the runtime; INFERENCE_MODEL_PATH overrides its default model file
+BACKEND_MODEL_PATHS = {'keras': KERAS_MODEL_PATH, 'tflite': 'Model.tflite', 'onnx': 'Model.onnx'}
+BACKEND = os.environ.get('INFERENCE_BACKEND', 'keras')
+MODEL_PATH = os.environ.get('INFERENCE_MODEL_PATH', BACKEND_MODEL_PATHS.get(BACKEND, KERAS_MODEL_PATH))
+# Thread pools per process (0 = runtime default); serve.py sets these per worker
+INTRA_OP_THREADS = int(os.environ.get('INTRA_OP_THREADS', 0)) or None
+INTER_OP_THREADS = int(os.environ.get('INTER_OP_THREADS', 0)) or None
+# Unix socket addresses of the inference workers used by the 'remote' backend
+REMOTE_ADDRESSES = [a for a in os.environ.get('INFERENCE_WORKERS', '').split(os.pathsep) if a]
+REMOTE_AUTHKEY = bytes.fromhex(os.environ.get('INFERENCE_WORKERS_AUTHKEY', ''))
+
+# Define class names
+class_names = ['Bacterial_spot',
+               'Early_blight',
+               'Late_blight',
+               'Leaf_Mold',
+               'Septorial_leaf_spot',
+               'Spider_mites Two-spotted_spider_mite',
+               'Tomato_Yellow_Leaf_Curl_Virus',
+               'Tomato_mosaic_virus',
+               'Healthy']
+
+def _quantize(x, details):
+    scale, zero_point = details['quantization']
+    dtype = details['dtype']
+    if scale and np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        x = np.clip(np.round(x / scale + zero_point), info.min, info.max)
+    return x.astype(dtype)
+
+
+def _dequantize(x, details):
+    scale, zero_point = details['quantization']
+    if scale and np.issubdtype(x.dtype, np.integer):
+        return (x.astype(np.float32) - zero_point) * scale
+    return x
+
+
+class KerasBackend:
+    def __init__(self, path, num_threads=None):
+        import tensorflow as tf
+        from keras.models import load_model
+        # Only takes effect before TensorFlow runs its first op in this process
+        if num_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        if INTER_OP_THREADS:
+            tf.config.threading.set_inter_op_parallelism_threads(INTER_OP_THREADS)
+        self.path = path
+        self.model = load_model(path)
+
+    def predict(self, img_batch):
+        return np.asarray(self.model.predict_on_batch(img_batch))
+
+
+class TFLiteBackend:
+    """Runs an exported ``.tflite`` model without importing full TensorFlow.
+
+    Uses ``tflite_runtime`` (or ``ai_edge_litert``) when installed and only
+    falls back to ``tf.lite``. Quantized inputs and outputs are converted
+    from and to float using the tensor's quantization parameters.
+
+    Resizing an interpreter is expensive, so batches are zero-padded up to
+    the next power of two and each of those sizes gets its own interpreter,
+    allocated once on first use.
+    """
+
+    def __init__(self, path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            try:
+                from ai_edge_litert.interpreter import Interpreter
+            except ImportError:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter
+        self.path = path
+        self.num_threads = num_threads
+        self._interpreter_cls = Interpreter
+        with open(path, 'rb') as f:
+            self._model_content = f.read()
+        self._interpreters = {}
+        self._lock = threading.Lock()
+
+    def _interpreter(self, batch_size, image_shape):
+        if batch_size not in self._interpreters:
+            interpreter = self._interpreter_cls(model_content=self._model_content, num_threads=self.num_threads)
+            input_index = interpreter.get_input_details()[0]['index']
+            interpreter.resize_tensor_input(input_index, (batch_size,) + image_shape)
+            interpreter.allocate_tensors()
+            self._interpreters[batch_size] = (interpreter,
+                                              interpreter.get_input_details()[0],
+                                              interpreter.get_output_details()[0])
+        return self._interpreters[batch_size]
+
+    def predict(self, img_batch):
+        n = len(img_batch)
+        padded_size = 1 << (n - 1).bit_length()
+        # Interpreters are not thread-safe
+        with self._lock:
+            interpreter, input_details, output_details = self._interpreter(padded_size, img_batch.shape[1:])
+            inputs = _quantize(img_batch, input_details)
+            if padded_size != n:
+                padded = np.zeros((padded_size,) + inputs.shape[1:], inputs.dtype)
+                padded[:n] = inputs
+                inputs = padded
+            interpreter.set_tensor(input_details['index'], inputs)
+            interpreter.invoke()
+            return _dequantize(interpreter.get_tensor(output_details['index']), output_details)[:n]
+
+
+class OnnxBackend:
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        if INTER_OP_THREADS:
+            options.inter_op_num_threads = INTER_OP_THREADS
+        self.path = path
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self._input = self.session.get_inputs()[0].name
+
+    def predict(self, img_batch):
+        return self.session.run(None, {self._input: img_batch.astype(np.float32)})[0]
+
+
+class RemoteBackend:
+    """Sends batches to inference worker processes over local sockets.
+
+    Each thread keeps its own connection to one worker (see serve.py); the
+    model itself is never loaded in this process.
+    """
+
+    def __init__(self, path, num_threads=None):
+        if not REMOTE_ADDRESSES:
+            raise ValueError("No inference workers configured (INFERENCE_WORKERS)")
+        self.path = path
+        self.addresses = REMOTE_ADDRESSES
+        self.authkey = REMOTE_AUTHKEY
+        self._local = threading.local()
+        self._counter = itertools.count()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            from multiprocessing.connection import Client
+            # Offset by pid so web workers forked from one parent spread over the workers
+            address = self.addresses[(os.getpid() + next(self._counter)) % len(self.addresses)]
+            conn = self._local.conn = Client(address, family='AF_UNIX', authkey=self.authkey)
+            self._local.pid = os.getpid()
+        return conn
+
+    def predict(self, img_batch):
+        conn = self._connection()
+        try:
+            conn.send(img_batch)
+            ok, payload = conn.recv()
+        except (EOFError, OSError):
+            self._local.conn = None
+            raise
+        if not ok:
+            raise RuntimeError(f"Inference worker failed: {payload}")
+        return payload
+
+
+BACKENDS = {'keras': KerasBackend, 'tflite': TFLiteBackend, 'onnx': OnnxBackend, 'remote': RemoteBackend}
+
+_backend = None
+
+
+def load_backend(name, path=None):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name!r}, expected one of {sorted(BACKENDS)}")
+    path = path or BACKEND_MODEL_PATHS.get(name, KERAS_MODEL_PATH)
+    if not os.path.exists(path):
+        raise ValueError("Model not found")
+    return BACKENDS[name](path, num_threads=INTRA_OP_THREADS)
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = load_backend(BACKEND, MODEL_PATH)
+    return _backend
+
+
+def load_image(source):
+    # ``source`` is a path or a binary file object
+    img = Image.open(source).convert('RGB').resize((IMAGE_SIZE, IMAGE_SIZE))
+    return np.array(img)
+
+
+def decode_predictions(preds):
+    return [(class_names[np.argmax(pred)], round(100 * float(np.max(pred)), 2)) for pred in preds]
+
+
+def predict_batch(img_batch):
+    return decode_predictions(get_backend().predict(img_batch))
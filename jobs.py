@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ('done', 'failed')
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, fn, args):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.args = args
+        self.done = threading.Event()
+
+
+class JobStore:
+    """Job status and results in SQLite, so every process can answer polls.
+
+    ``path`` is a database file shared by all web workers (serve.py sets
+    JOB_DB_PATH); ``None`` keeps the jobs in this process's memory only.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            if self._pid != os.getpid():
+                # SQLite connections must not be shared with a forked child
+                self._conn = self._connect()
+                self._pid = os.getpid()
+            return self._conn.execute(sql, params).fetchall()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path or ':memory:', timeout=30, isolation_level=None,
+                               check_same_thread=False)
+        if self.path:
+            conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, '
+                     'result TEXT, error TEXT, created REAL NOT NULL, finished REAL)')
+        return conn
+
+    def add(self, job_id):
+        self._execute('INSERT INTO jobs (id, status, created) VALUES (?, ?, ?)', (job_id, 'queued', time.time()))
+
+    def delete(self, job_id):
+        self._execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def set_running(self, job_id):
+        self._execute('UPDATE jobs SET status = ? WHERE id = ?', ('running', job_id))
+
+    def set_finished(self, job_id, result=None, error=None):
+        self._execute('UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE id = ?',
+                      ('failed' if error is not None else 'done', json.dumps(result), error, time.time(), job_id))
+
+    def get(self, job_id):
+        rows = self._execute('SELECT status, result, error FROM jobs WHERE id = ?', (job_id,))
+        if not rows:
+            return None
+        status, result, error = rows[0]
+        data = {'job_id': job_id, 'status': status}
+        if status == 'done':
+            data['result'] = json.loads(result)
+        elif status == 'failed':
+            data['error'] = error
+        return data
+
+    def expire(self, cutoff):
+        self._execute('DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?', (cutoff,))
+
+    def counts(self):
+        return dict(self._execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'))
+
+
+class JobQueue:
+    """Runs submitted jobs on a fixed number of worker threads.
+
+    At most ``max_queued`` jobs wait for a worker; beyond that ``submit()``
+    raises ``QueueFull`` so callers can push back instead of piling up work.
+    Job status and results go to a ``JobStore`` at ``path`` and are kept for
+    ``result_ttl`` seconds, so any process sharing the store can poll a job
+    whichever process runs it. Results must be JSON serializable.
+    """
+
+    def __init__(self, workers=2, max_queued=64, result_ttl=600, path=None, poll_interval=0.2):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._store = JobStore(path)
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self.rejected = 0
+
+    def submit(self, fn, *args):
+        self._ensure_workers()
+        self._store.expire(time.time() - self.result_ttl)
+        job = Job(fn, args)
+        self._store.add(job.id)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+                self.rejected += 1
+            self._store.delete(job.id)
+            raise QueueFull(f"{self.max_queued} jobs already queued")
+        return job
+
+    def get(self, job_id):
+        """Return the job's status dict, or ``None`` if it is unknown or expired."""
+        return self._store.get(job_id)
+
+    def wait(self, job_id, timeout):
+        """Like ``get()``, but first wait up to ``timeout`` seconds for the job to finish."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+            return self.get(job_id)
+        # Submitted in another process: poll the shared store
+        deadline = time.monotonic() + timeout
+        while True:
+            data = self.get(job_id)
+            if data is None or data['status'] in FINISHED or time.monotonic() >= deadline:
+                return data
+            time.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        counts = self._store.counts()
+        return {
+            'workers': self.workers,
+            'max_queued': self.max_queued,
+            'queued': counts.get('queued', 0),
+            'running': counts.get('running', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'rejected': self.rejected,
+        }
+
+    def _ensure_workers(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            if self._pid is not None:
+                self._queue = queue.Queue(maxsize=self.max_queued)
+                self._jobs = {}
+            self._pid = pid
+            self._threads = [threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+                             for i in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            self._store.set_running(job.id)
+            try:
+                self._store.set_finished(job.id, result=job.fn(*job.args))
+            except Exception as exc:
+                logger.exception("Job %s failed", job.id)
+                self._store.set_finished(job.id, error=f'{type(exc).__name__}: {exc}')
+            job.fn = job.args = None
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            job.done.set()
@@ -0,0 +1,48 @@
+"""Disease details knowledge base, loaded from disease_details.json.
+
+The file is read and its text normalized once, on first use. Per-class JSON
+bodies (plain and gzip) are built once for every known class and reused for
+every later response; other names are not cached.
+"""
+import gzip
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'disease_details.json')
+
+
+def normalize(text):
+    # One sentence per line, without the indentation of the original source
+    return '\n'.join(line.strip() for line in text.strip().splitlines() if line.strip())
+
+
+@lru_cache(maxsize=None)
+def load_details(path=DATA_PATH):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {name: {section: normalize(text) for section, text in sections.items()}
+            for name, sections in data.items()}
+
+
+def details_for(name):
+    return load_details().get(name)
+
+
+def _render_json(name, sections):
+    body = json.dumps({'pred_class': name, 'details': sections}, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    return body, gzip.compress(body, compresslevel=9, mtime=0), etag
+
+
+@lru_cache(maxsize=None)
+def _rendered():
+    # Keyed by the known classes only, so unknown names never add entries
+    return {name: _render_json(name, sections) for name, sections in load_details().items()}
+
+
+def details_json(name):
+    """Return ``(body, gzipped_body, etag)`` for one class, or ``None``."""
+    return _rendered().get(name)
@@ -0,0 +1,263 @@
+"""Minimal in-process metrics rendered in the Prometheus text format.
+
+Metrics live in the process that records them. When several processes
+serve the app (serve.py), give the ``Registry`` a shared ``directory``:
+each process then writes its values there and ``render()`` merges them,
+so any worker answers a scrape for all of them.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}")
+        return tuple((name, labels[name]) for name in self.labelnames)
+
+    def render(self, values=None):
+        # ``values`` as returned by values(), e.g. merged from several processes
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines.extend(f'{name}{_format_labels(labels)} {_format_value(value)}'
+                     for name, labels, value in self.samples(values))
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(values, other):
+        for key, value in other.items():
+            values[key] = values.get(key, 0) + value
+
+    def samples(self, values=None):
+        values = self.values() if values is None else values
+        return [(self.name, key, value) for key, value in sorted(values.items())]
+
+
+class Gauge(Metric):
+    """A value read from ``fn()`` at render time."""
+    type = 'gauge'
+
+    def __init__(self, name, documentation, fn):
+        super().__init__(name, documentation)
+        self.fn = fn
+
+    def values(self):
+        return {(): self.fn()}
+
+    def samples(self, values=None):
+        values = self.values() if values is None else values
+        return [(self.name, key, value) for key, value in sorted(values.items())]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def values(self):
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+    @staticmethod
+    def merge(values, other):
+        for key, (counts, total) in other.items():
+            if key in values:
+                old_counts, old_total = values[key]
+                counts, total = [a + b for a, b in zip(old_counts, counts)], old_total + total
+            values[key] = (list(counts), total)
+
+    def samples(self, values=None):
+        values = self.values() if values is None else values
+        samples = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', key + (('le', _format_value(bound)),), cumulative))
+            samples.append((f'{self.name}_sum', key, total))
+            samples.append((f'{self.name}_count', key, cumulative))
+        return samples
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Registry:
+    """Holds the metrics of one app and renders them.
+
+    With ``directory`` set, each process writes its values to
+    ``<directory>/<pid>.json`` every ``interval`` seconds and at exit, and
+    ``render()`` merges all files: counters and histograms are summed, also
+    over processes that have exited, and gauges get one sample per live
+    process with a ``pid`` label.
+    """
+
+    def __init__(self, directory=None, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self._metrics = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pid = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self._write_at_exit)
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def ensure_writer(self):
+        # Started lazily, like the other background threads, so each forked
+        # worker writes its own file
+        pid = os.getpid()
+        if not self.directory or self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            threading.Thread(target=self._run, name='metrics-writer', daemon=True).start()
+
+    def write(self):
+        snapshot = {metric.name: [[key, value] for key, value in metric.values().items()]
+                    for metric in self._metrics}
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with self._write_lock:
+            with open(f'{path}.tmp', 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(f'{path}.tmp', path)
+
+    def render(self):
+        if not self.directory:
+            return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+        self.ensure_writer()
+        self.write()
+        merged = {metric.name: {} for metric in self._metrics}
+        for pid, snapshot in self._read_snapshots():
+            alive = _pid_alive(pid)
+            for metric in self._metrics:
+                values = {tuple(tuple(label) for label in key): value
+                          for key, value in snapshot.get(metric.name, [])}
+                if isinstance(metric, Gauge):
+                    if alive:
+                        merged[metric.name].update({(('pid', pid),): value for value in values.values()})
+                else:
+                    metric.merge(merged[metric.name], values)
+        return '\n'.join(metric.render(merged[metric.name]) for metric in self._metrics) + '\n'
+
+    def _read_snapshots(self):
+        for entry in os.scandir(self.directory):
+            name, ext = os.path.splitext(entry.name)
+            if ext != '.json' or not name.isdigit():
+                continue
+            try:
+                with open(entry.path) as f:
+                    yield int(name), json.load(f)
+            except (OSError, ValueError):
+                logger.warning("Ignoring unreadable metrics file %s", entry.path)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except OSError:
+                logger.exception("Could not write metrics to %s", self.directory)
+
+    def _write_at_exit(self):
+        # Keep the last counts of a worker that is shutting down
+        if self._pid == os.getpid():
+            try:
+                self.write()
+            except OSError:
+                pass
+
+
+def process_rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        # Falls back to peak RSS, reported in bytes on macOS and kilobytes elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
@@ -0,0 +1,244 @@
+"""Production server for the Flask app (gunicorn with threaded workers).
+
+Two ways to share the model between web workers:
+
+* ``--inference-workers N`` starts N dedicated inference processes, each
+  pinned to its own slice of CPUs and loading the model once. Web workers
+  run the 'remote' backend and send their batches over Unix sockets, so
+  they never import TensorFlow themselves.
+* ``--inference-workers 0`` loads the model once in the gunicorn master and
+  forks the web workers from it (copy-on-write), pinning each one to its
+  own CPUs. Only for the tflite/onnx backends; TensorFlow is not fork-safe
+  once it has started its thread pools, so keras is refused.
+
+Async jobs (/async) and metrics are kept in files shared by all web
+workers, so a poll or a /metrics scrape can land on any of them.
+
+    python serve.py --bind 0.0.0.0:8000 --web-workers 4 --inference-workers 2
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from multiprocessing.connection import Listener
+
+import inference
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def cpu_slices(n, cpus=None):
+    cpus = cpus or available_cpus()
+    if n <= 0:
+        return []
+    if n >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(n)]
+    size, extra = divmod(len(cpus), n)
+    slices, start = [], 0
+    for i in range(n):
+        end = start + size + (i < extra)
+        slices.append(cpus[start:end])
+        start = end
+    return slices
+
+
+def pin_to_cpus(cpus):
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+    elif cpus:
+        logger.warning("CPU affinity is not supported on this platform")
+
+
+def _serve_connection(backend, lock, conn):
+    with conn:
+        while True:
+            try:
+                img_batch = conn.recv()
+            except EOFError:
+                return
+            try:
+                # One forward pass at a time keeps the worker on its own cores
+                with lock:
+                    preds = backend.predict(img_batch)
+                conn.send((True, preds))
+            except Exception as exc:
+                logger.exception("Inference failed")
+                conn.send((False, f'{type(exc).__name__}: {exc}'))
+
+
+def run_inference_worker(address, authkey, backend_name, model_path, cpus,
+                         intra_op_threads, inter_op_threads, ready):
+    pin_to_cpus(cpus)
+    inference.INTRA_OP_THREADS = intra_op_threads
+    inference.INTER_OP_THREADS = inter_op_threads
+    backend = inference.load_backend(backend_name, model_path)
+    lock = threading.Lock()
+    with Listener(address, family='AF_UNIX', authkey=authkey) as listener:
+        ready.set()
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_serve_connection, args=(backend, lock, conn), daemon=True).start()
+
+
+def start_inference_workers(n, socket_dir, args):
+    ctx = multiprocessing.get_context('spawn')
+    authkey = os.urandom(32)
+    addresses, processes = [], []
+    for i, cpus in enumerate(cpu_slices(n)):
+        address = os.path.join(socket_dir, f'inference-{i}.sock')
+        ready = ctx.Event()
+        process = ctx.Process(target=run_inference_worker, name=f'inference-{i}', daemon=True,
+                              args=(address, authkey, inference.BACKEND, inference.MODEL_PATH,
+                                    cpus if args.pin else None,
+                                    args.intra_op_threads or len(cpus), args.inter_op_threads, ready))
+        process.start()
+        addresses.append(address)
+        processes.append((process, ready))
+    for process, ready in processes:
+        while not ready.wait(1):
+            if not process.is_alive():
+                raise RuntimeError(f"{process.name} exited while loading the model")
+    return addresses, authkey, [process for process, _ in processes]
+
+
+def inference_worker_hooks(args):
+    """gunicorn hooks that own the inference processes and their sockets.
+
+    Everything is created in ``on_starting`` and removed in ``on_exit``, which
+    only run in the master, so web workers exiting or being replaced never
+    tear down state they merely inherited.
+    """
+    state = {'socket_dir': None, 'processes': []}
+
+    def stop_inference_workers():
+        for process in state['processes']:
+            process.terminate()
+        for process in state['processes']:
+            process.join(5)
+        if state['socket_dir']:
+            shutil.rmtree(state['socket_dir'], ignore_errors=True)
+
+    def on_starting(server):
+        state['socket_dir'] = tempfile.mkdtemp(prefix='tomato-serve-')
+        try:
+            addresses, authkey, state['processes'] = start_inference_workers(
+                args.inference_workers, state['socket_dir'], args)
+        except BaseException:
+            stop_inference_workers()
+            raise
+        # Web workers are forked from the master and pick these up
+        inference.REMOTE_ADDRESSES = addresses
+        inference.REMOTE_AUTHKEY = authkey
+        inference.BACKEND = 'remote'
+
+    def post_fork(server, worker):
+        # The inference processes belong to the master. Without this, the
+        # multiprocessing atexit hook in an exiting web worker would still see
+        # them as its children and terminate them.
+        multiprocessing.process._children.clear()
+
+    def on_exit(server):
+        stop_inference_workers()
+
+    return {'on_starting': on_starting, 'post_fork': post_fork, 'on_exit': on_exit}
+
+
+def cpu_pinning_hooks(slices):
+    """gunicorn hooks giving each web worker the least used CPU slice.
+
+    Slices are assigned in the master (``pre_fork``) and handed back when the
+    worker exits (``child_exit``), so replacement workers take the slice that
+    was freed rather than doubling up on a busy one.
+    """
+    in_use = [0] * len(slices)
+
+    def pre_fork(server, worker):
+        worker.cpu_slice = min(range(len(slices)), key=in_use.__getitem__)
+        in_use[worker.cpu_slice] += 1
+
+    def post_fork(server, worker):
+        pin_to_cpus(slices[worker.cpu_slice])
+
+    def child_exit(server, worker):
+        in_use[worker.cpu_slice] -= 1
+
+    return {'pre_fork': pre_fork, 'post_fork': post_fork, 'child_exit': child_exit}
+
+
+def make_server(app_options):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("serve.py needs gunicorn: pip install gunicorn")
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in app_options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from app import app
+            return app
+
+    return Server()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the tomato disease detection app.")
+    parser.add_argument('-b', '--bind', default='127.0.0.1:8000')
+    parser.add_argument('-w', '--web-workers', type=int, default=2)
+    parser.add_argument('-t', '--threads', type=int, default=8,
+                        help="request threads per web worker (they share one micro-batcher)")
+    parser.add_argument('-i', '--inference-workers', type=int, default=len(available_cpus()) // 2 or 1,
+                        help="dedicated model processes; 0 loads the model once before forking web workers "
+                             "(tflite/onnx only)")
+    parser.add_argument('--intra-op-threads', type=int, default=0,
+                        help="intra-op threads per model process (default: its CPU slice size)")
+    parser.add_argument('--inter-op-threads', type=int, default=1)
+    parser.add_argument('--no-pin', dest='pin', action='store_false', help="do not set CPU affinity")
+    args = parser.parse_args(argv)
+    if args.inference_workers <= 0 and inference.BACKEND == 'keras':
+        # TensorFlow's thread pools do not survive the fork, so workers can hang
+        parser.error("--inference-workers 0 preloads the model before forking, which TensorFlow "
+                     "does not support; use --inference-workers N or INFERENCE_BACKEND=tflite/onnx")
+    logging.basicConfig(level=logging.INFO)
+
+    options = {
+        'bind': args.bind,
+        'workers': args.web_workers,
+        'threads': args.threads,
+        'worker_class': 'gthread',
+    }
+    if args.inference_workers > 0:
+        options.update(inference_worker_hooks(args))
+    else:
+        slices = cpu_slices(args.web_workers)
+        inference.INTRA_OP_THREADS = args.intra_op_threads or (len(slices[0]) if slices else None)
+        inference.INTER_OP_THREADS = args.inter_op_threads
+        options['preload_app'] = True
+        if args.pin and slices:
+            options.update(cpu_pinning_hooks(slices))
+    # Web workers share async job state and metrics through files in here
+    state_dir = tempfile.mkdtemp(prefix='tomato-state-')
+    os.environ.setdefault('JOB_DB_PATH', os.path.join(state_dir, 'jobs.sqlite3'))
+    os.environ.setdefault('METRICS_DIR', os.path.join(state_dir, 'metrics'))
+    master_pid = os.getpid()
+    try:
+        make_server(options).run()
+    finally:
+        # Exiting web workers unwind through here too; only the master cleans up
+        if os.getpid() == master_pid:
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Names UploadStore.save() hands out: 32 hex digits of the content hash and the extension
+STORED_NAME = re.compile(r'[0-9a-f]{32}\.[a-z0-9]+')
+
+
+class UploadStore:
+    """Persists uploads in the background under content-addressed names.
+
+    ``save()`` returns immediately with the file name the upload will get
+    (a hash of its bytes plus the original extension), so identical uploads
+    share one file and different ones never overwrite each other. A writer
+    thread stores the files and then deletes the oldest ones while the folder
+    holds more than ``max_bytes`` or files are older than ``max_age`` seconds.
+
+    Retention only looks at content-addressed names, so other files in the
+    folder are left alone, and usage is read from the folder after every
+    write, so processes sharing it enforce one common limit.
+    """
+
+    def __init__(self, folder, max_bytes=None, max_age=None, queue_size=256):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        os.makedirs(folder, exist_ok=True)
+        entries = self._scan()
+        self._usage = (len(entries), sum(size for _, _, size in entries))
+
+    def save(self, data, filename):
+        ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else 'bin'
+        name = f'{hashlib.sha256(data).hexdigest()[:32]}.{ext}'
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((name, data))
+        except queue.Full:
+            logger.warning("Upload store queue full, not keeping %s", name)
+            return None
+        return name
+
+    def join(self):
+        """Block until every upload queued in this process is written."""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            files, total_bytes = self._usage
+        return {
+            'files': files,
+            'bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'max_age': self.max_age,
+            'pending': self._queue.qsize(),
+        }
+
+    def _scan(self):
+        # Oldest first; only files this store could have written
+        entries = []
+        for entry in os.scandir(self.folder):
+            if STORED_NAME.fullmatch(entry.name) and entry.is_file():
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, entry.name, st.st_size))
+        return sorted(entries)
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='upload-store', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            name, data = self._queue.get()
+            try:
+                self._write(name, data)
+                self._enforce_retention()
+            except OSError:
+                logger.exception("Could not store upload %s", name)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, name, data):
+        path = os.path.join(self.folder, name)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def _enforce_retention(self):
+        now = time.time()
+        entries = self._scan()
+        total_bytes = sum(size for _, _, size in entries)
+        kept = len(entries)
+        for mtime, name, size in entries:
+            too_big = self.max_bytes is not None and total_bytes > self.max_bytes
+            too_old = self.max_age is not None and now - mtime > self.max_age
+            if not (too_big or too_old):
+                break
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except FileNotFoundError:
+                # Already removed by another process sharing the folder
+                pass
+            total_bytes -= size
+            kept -= 1
+        with self._lock:
+            self._usage = (kept, total_bytes)
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from batching import BatchPredictor
+
+
+class RecordingModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, img_batch):
+        self.batch_sizes.append(len(img_batch))
+        # Each image is filled with its caller's number
+        return [int(img[0, 0]) for img in img_batch]
+
+
+def submit_all(predictor, count):
+    return [predictor.submit(np.full((2, 2), i, np.uint8)) for i in range(count)]
+
+
+def test_each_caller_gets_its_own_result():
+    model = RecordingModel()
+    predictor = BatchPredictor(model, max_batch_size=8, max_wait_ms=50)
+    futures = submit_all(predictor, 20)
+    assert [future.result(5) for future in futures] == list(range(20))
+    assert sum(model.batch_sizes) == 20
+
+
+def test_batches_split_at_max_batch_size():
+    model = RecordingModel()
+    predictor = BatchPredictor(model, max_batch_size=4, max_wait_ms=1000)
+    futures = submit_all(predictor, 10)
+    for future in futures:
+        future.result(5)
+    assert max(model.batch_sizes) == 4
+    assert sum(model.batch_sizes) == 10
+
+
+def test_partial_batch_sent_after_max_wait():
+    model = RecordingModel()
+    predictor = BatchPredictor(model, max_batch_size=16, max_wait_ms=20)
+    start = time.monotonic()
+    assert predictor.predict(np.full((2, 2), 7, np.uint8), timeout=5) == 7
+    assert time.monotonic() - start < 1
+    assert model.batch_sizes == [1]
+
+
+def test_model_error_reaches_every_caller():
+    release = threading.Event()
+
+    def failing_model(img_batch):
+        release.wait(5)
+        raise RuntimeError('model crashed')
+
+    predictor = BatchPredictor(failing_model, max_batch_size=8, max_wait_ms=100)
+    futures = submit_all(predictor, 3)
+    release.set()
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model crashed'):
+            future.result(5)
+
+
+def test_worker_survives_a_failed_batch():
+    calls = []
+
+    def flaky_model(img_batch):
+        calls.append(len(img_batch))
+        if len(calls) == 1:
+            raise RuntimeError('first batch fails')
+        return [0] * len(img_batch)
+
+    predictor = BatchPredictor(flaky_model, max_batch_size=1, max_wait_ms=0)
+    with pytest.raises(RuntimeError):
+        predictor.predict(np.zeros((2, 2), np.uint8), timeout=5)
+    assert predictor.predict(np.zeros((2, 2), np.uint8), timeout=5) == 0
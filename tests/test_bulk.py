@@ -0,0 +1,63 @@
+import io
+import zipfile
+
+import numpy as np
+from PIL import Image
+
+import bulk
+
+
+def png_bytes(value=0):
+    img = io.BytesIO()
+    Image.fromarray(np.full((32, 32, 3), value, np.uint8)).save(img, format='PNG')
+    return img.getvalue()
+
+
+def make_zip(count):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        for i in range(count):
+            zf.writestr(f'Healthy/leaf_{i}.png', png_bytes(i * 10))
+    buf.seek(0)
+    return buf
+
+
+def fake_predict_batch(img_batch):
+    return [('Healthy', 99.0)] * len(img_batch)
+
+
+def test_zip_smaller_than_one_batch(monkeypatch):
+    monkeypatch.setattr(bulk, 'predict_batch', fake_predict_batch)
+    results = list(bulk.predict_stream(bulk.iter_zip(make_zip(5)), batch_size=64))
+    assert [r['file'] for r in results] == [f'Healthy/leaf_{i}.png' for i in range(5)]
+    assert all('error' not in r for r in results)
+    assert all(r['label'] == 'Healthy' and r['pred_class'] == 'Healthy' for r in results)
+
+
+def test_zip_with_partial_last_batch(monkeypatch):
+    monkeypatch.setattr(bulk, 'predict_batch', fake_predict_batch)
+    results = list(bulk.predict_stream(bulk.iter_zip(make_zip(7)), batch_size=3))
+    assert len(results) == 7
+    assert all('error' not in r for r in results)
+
+
+def test_oversized_member_is_reported_not_read(monkeypatch):
+    monkeypatch.setattr(bulk, 'predict_batch', fake_predict_batch)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('Healthy/huge.png', b'\0' * 100000)
+        zf.writestr('Healthy/small.png', png_bytes())
+    buf.seek(0)
+    results = list(bulk.predict_stream(bulk.iter_zip(buf, max_member_bytes=50000)))
+    assert results[0]['error'].startswith('MemberTooLarge: Healthy/huge.png')
+    assert results[1]['pred_class'] == 'Healthy'
+
+
+def test_decode_error_names_the_member(monkeypatch):
+    monkeypatch.setattr(bulk, 'predict_batch', fake_predict_batch)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as zf:
+        zf.writestr('Healthy/broken.png', b'not an image')
+    buf.seek(0)
+    [result] = bulk.predict_stream(bulk.iter_zip(buf))
+    assert result['error'] == 'UnidentifiedImageError: cannot decode Healthy/broken.png'
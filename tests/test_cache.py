@@ -0,0 +1,72 @@
+import json
+import threading
+
+import numpy as np
+
+import cache
+from cache import PredictionCache, image_key
+
+
+def test_image_key_depends_on_content_shape_and_dtype():
+    img = np.zeros((4, 4, 3), np.uint8)
+    assert image_key(img) == image_key(img.copy())
+    assert image_key(img) != image_key(np.ones((4, 4, 3), np.uint8))
+    assert image_key(img) != image_key(np.zeros((4, 12), np.uint8))
+
+
+def test_lru_eviction():
+    predictions = PredictionCache(max_entries=2)
+    predictions.put('a', ('Healthy', 99.0))
+    predictions.put('b', ('Early_blight', 80.0))
+    assert predictions.get('a') == ('Healthy', 99.0)
+    predictions.put('c', ('Late_blight', 70.0))
+    assert predictions.get('b') is None
+    assert predictions.get('a') == ('Healthy', 99.0)
+    assert predictions.stats()['evictions'] == 1
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    predictions = PredictionCache(ttl=60)
+    predictions.put('a', ('Healthy', 99.0))
+    now[0] += 59
+    assert predictions.get('a') == ('Healthy', 99.0)
+    now[0] += 2
+    assert predictions.get('a') is None
+    assert predictions.stats()['entries'] == 0
+
+
+def test_persisted_cache_reloads_for_same_model(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    first = PredictionCache(path=path, model_version='v1')
+    first.put('a', ('Healthy', 99.0))
+    first.save()
+    assert PredictionCache(path=path, model_version='v1').get('a') == ('Healthy', 99.0)
+
+
+def test_persisted_cache_discarded_for_other_model(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    first = PredictionCache(path=path, model_version='v1')
+    first.put('a', ('Healthy', 99.0))
+    first.save()
+    assert PredictionCache(path=path, model_version='v2').stats()['entries'] == 0
+
+
+def test_concurrent_saves(tmp_path):
+    path = str(tmp_path / 'cache.json')
+    predictions = PredictionCache(path=path, model_version='v1', save_every=1)
+
+    def writer(offset):
+        for i in range(50):
+            predictions.put(f'{offset}-{i}', ('Healthy', 99.0))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    predictions.save()
+    with open(path) as f:
+        assert len(json.load(f)['entries']) == 400
+    assert list(tmp_path.iterdir()) == [tmp_path / 'cache.json']
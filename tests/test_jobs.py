@@ -0,0 +1,53 @@
+import multiprocessing
+import time
+
+import pytest
+
+from jobs import JobQueue, QueueFull
+
+
+def slow_square(x):
+    time.sleep(0.3)
+    return {'square': x * x}
+
+
+def poll_job(path, job_id, results):
+    results.put(JobQueue(workers=0, path=path).wait(job_id, 10))
+
+
+def test_job_polled_from_another_process(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    job_queue = JobQueue(workers=1, path=path)
+    job = job_queue.submit(slow_square, 7)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    poller = ctx.Process(target=poll_job, args=(path, job.id, results))
+    poller.start()
+    try:
+        assert results.get(timeout=30) == {'job_id': job.id, 'status': 'done', 'result': {'square': 49}}
+    finally:
+        poller.join(10)
+
+
+def test_failed_job_reports_error(tmp_path):
+    job_queue = JobQueue(workers=1, path=str(tmp_path / 'jobs.sqlite3'))
+    job = job_queue.submit(int, 'not a number')
+    data = job_queue.wait(job.id, 10)
+    assert data['status'] == 'failed'
+    assert data['error'].startswith('ValueError')
+
+
+def test_unknown_job():
+    assert JobQueue().get('missing') is None
+
+
+def test_queue_full_rejects_without_keeping_the_job():
+    job_queue = JobQueue(workers=0, max_queued=2)
+    job_queue.submit(slow_square, 1)
+    job_queue.submit(slow_square, 2)
+    with pytest.raises(QueueFull):
+        job_queue.submit(slow_square, 3)
+    stats = job_queue.stats()
+    assert stats['queued'] == 2
+    assert stats['rejected'] == 1
@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+
+from metrics import Registry
+
+
+def make_registry(directory=None):
+    registry = Registry(directory)
+    requests = registry.counter('requests_total', 'Requests', ['endpoint'])
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    registry.gauge('queue_depth', 'Queue depth', lambda: 4)
+    return registry, requests, latency
+
+
+def record_in_worker(directory):
+    registry, requests, latency = make_registry(directory)
+    registry.ensure_writer()
+    requests.inc(3, endpoint='home')
+    latency.observe(0.5)
+
+
+def test_render_single_process():
+    registry, requests, latency = make_registry()
+    requests.inc(endpoint='home')
+    latency.observe(0.05)
+    latency.observe(2)
+    lines = registry.render().splitlines()
+    assert 'requests_total{endpoint="home"} 1' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 1' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert 'latency_seconds_count 2' in lines
+    assert 'queue_depth 4' in lines
+
+
+def test_render_merges_processes(tmp_path):
+    directory = str(tmp_path)
+    worker = multiprocessing.get_context('spawn').Process(target=record_in_worker, args=(directory,))
+    worker.start()
+    worker.join(30)
+    assert worker.exitcode == 0
+
+    registry, requests, latency = make_registry(directory)
+    requests.inc(2, endpoint='home')
+    latency.observe(0.05)
+    lines = registry.render().splitlines()
+    # The exited worker's counts are kept, its gauge is not
+    assert 'requests_total{endpoint="home"} 5' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'latency_seconds_count 2' in lines
+    assert [line for line in lines if line.startswith('queue_depth')] == [f'queue_depth{{pid="{os.getpid()}"}} 4']
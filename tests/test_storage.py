@@ -0,0 +1,65 @@
+import os
+import time
+
+from storage import UploadStore
+
+
+def store_and_wait(store, data, filename):
+    name = store.save(data, filename)
+    store.join()
+    return name
+
+
+def age(path, seconds):
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_identical_uploads_share_one_file(tmp_path):
+    store = UploadStore(str(tmp_path))
+    first = store_and_wait(store, b'leaf', 'a.png')
+    second = store_and_wait(store, b'leaf', 'b.PNG')
+    assert first == second
+    assert len(first) == len('0' * 32 + '.png')
+    assert (tmp_path / first).read_bytes() == b'leaf'
+    assert store.stats()['files'] == 1
+
+
+def test_size_cap_removes_oldest(tmp_path):
+    store = UploadStore(str(tmp_path), max_bytes=25)
+    old = store_and_wait(store, b'a' * 10, 'old.png')
+    age(tmp_path / old, 60)
+    middle = store_and_wait(store, b'b' * 10, 'middle.png')
+    age(tmp_path / middle, 30)
+    new = store_and_wait(store, b'c' * 10, 'new.png')
+    assert sorted(os.listdir(tmp_path)) == sorted([middle, new])
+    assert store.stats()['bytes'] == 20
+
+
+def test_age_cap(tmp_path):
+    store = UploadStore(str(tmp_path), max_age=3600)
+    old = store_and_wait(store, b'old', 'old.jpg')
+    age(tmp_path / old, 7200)
+    new = store_and_wait(store, b'new', 'new.jpg')
+    assert os.listdir(tmp_path) == [new]
+
+
+def test_other_files_are_left_alone(tmp_path):
+    # Uploads saved by the 'disk' upload mode keep their original names
+    (tmp_path / 'leaf.jpg').write_bytes(b'x' * 100)
+    (tmp_path / ('0' * 32 + '.png.123.tmp')).write_bytes(b'x' * 100)
+    for name in os.listdir(tmp_path):
+        age(tmp_path / name, 7200)
+    store = UploadStore(str(tmp_path), max_bytes=10, max_age=3600)
+    stored = store_and_wait(store, b'new', 'new.png')
+    assert sorted(os.listdir(tmp_path)) == sorted(['leaf.jpg', '0' * 32 + '.png.123.tmp', stored])
+
+
+def test_limit_shared_between_stores(tmp_path):
+    # Like two web workers with their own UploadStore on one folder
+    first, second = UploadStore(str(tmp_path), max_bytes=25), UploadStore(str(tmp_path), max_bytes=25)
+    names = []
+    for i, store in enumerate([first, second, first, second]):
+        names.append(store_and_wait(store, bytes([i]) * 10, f'{i}.png'))
+        age(tmp_path / names[-1], 100 - i)
+    assert sorted(os.listdir(tmp_path)) == sorted(names[2:])